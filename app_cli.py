@@ -10,8 +10,11 @@ Options:
 4) Exit
 """
 
+import math
+from datetime import datetime
+
 from model import EXERCISES
-from storage import log_set, log_daily_recovery
+from storage import log_sets_bulk, log_daily_recovery
 from recovery_logic import (
     compute_current_muscle_readiness,
     classify_muscle,
@@ -51,36 +54,55 @@ def log_workout_sets():
     ex_name = EXERCISES[ex_id]["name"]
     print(f"\nLogging sets for: {ex_name}\n")
 
-    while True:
-        try:
-            reps = int(input("Reps (or 0 to stop): "))
-        except ValueError:
-            print("Please type a number.\n")
-            continue
-
-        if reps == 0:
-            break
+    # saved together at the end: one read + write of data.json, not one per set
+    rows = []
+    try:
+        while True:
+            try:
+                reps = int(input("Reps (or 0 to stop): "))
+            except ValueError:
+                print("Please type a number.\n")
+                continue
 
-        try:
-            weight = float(input("Weight (kg): "))
-        except ValueError:
-            print("Please type a number.\n")
-            continue
+            if reps == 0:
+                break
 
-        rir_input = input("RIR (0–5, blank if unknown): ").strip()
-        if rir_input == "":
-            rir = None
-        else:
             try:
-                rir = int(rir_input)
+                weight = float(input("Weight (kg): "))
             except ValueError:
-                print("Invalid RIR, using None.")
+                print("Please type a number.\n")
+                continue
+            # float() also accepts "nan" and "inf"
+            if not math.isfinite(weight):
+                print("Please type a number.\n")
+                continue
+
+            rir_input = input("RIR (0–5, blank if unknown): ").strip()
+            if rir_input == "":
                 rir = None
-
-        log_set(USER_ID, ex_id, reps=reps, weight=weight, rir=rir)
-        print("✅ Set logged.\n")
-
-    print("Done logging sets.\n")
+            else:
+                try:
+                    rir = int(rir_input)
+                except ValueError:
+                    print("Invalid RIR, using None.")
+                    rir = None
+
+            rows.append(
+                {
+                    "exercise_id": ex_id,
+                    "reps": reps,
+                    "weight": weight,
+                    "rir": rir,
+                    # stamped when entered, as log_set would have done
+                    "timestamp": datetime.now(),
+                }
+            )
+            print("✅ Set added (saved when you finish).\n")
+    finally:
+        # also on Ctrl-C, EOF or an error, so the sets typed so far aren't lost
+        log_sets_bulk(USER_ID, rows)
+
+    print(f"Done logging sets ({len(rows)} saved).\n")
 
 
 def log_today_recovery():
@@ -92,6 +114,8 @@ def log_today_recovery():
         try:
             sleep_hours = float(sleep_input)
         except ValueError:
+            sleep_hours = None
+        if sleep_hours is None or not math.isfinite(sleep_hours):
             print("Invalid, using None.")
             sleep_hours = None
 
@@ -1,25 +1,125 @@
 # app_streamlit.py
 
 import streamlit as st
-from auth import create_user, verify_user, _load_users
+from auth import create_user, verify_user, list_usernames
+import numpy as np
 import pandas as pd
-from model import EXERCISES, MUSCLES
+from model import (
+    EXERCISES,
+    EXERCISE_LABELS,
+    EXERCISE_LABELS_SORTED,
+    EXERCISE_NAMES,
+    MUSCLES,
+    MUSCLE_LABELS,
+    MUSCLE_TO_EXERCISES,
+)
 from datetime import datetime, date, timedelta
-import altair as alt
-from storage import log_set, get_all_sets, delete_set_by_id
+from storage import log_set, get_sets_for_user, delete_set_by_id, data_version
 from recovery_logic import (
+    CURVE_DAYS_AHEAD,
+    MUSCLE_STATUS_DESTROYED,
+    MUSCLE_STATUS_EDGES,
+    MUSCLE_STATUS_LABELS,
     compute_current_muscle_readiness,
     compute_muscle_readiness_days_ahead,
+    compute_muscle_readiness_curve,
     classify_muscle,
     classify_exercise,
 )
 
+# Must be the first Streamlit call of every run (login screen included)
+st.set_page_config(
+    page_title="Muscle Recovery Dashboard",
+    layout="wide",
+)
+
 # Who is allowed to use the admin tools
 ADMIN_USERS = {"Ahmed"}
 
+# Vega-Lite specs for the charts. Data is passed separately to
+# st.vega_lite_chart, so these are built once instead of via Altair per rerun.
+READINESS_BAR_SPEC = {
+    "mark": "bar",
+    "encoding": {
+        "x": {"field": "Readiness %", "type": "quantitative", "scale": {"domain": [0, 100]}},
+        "y": {"field": "Muscle", "type": "nominal", "sort": "-x"},
+    },
+}
+RECOVERY_CURVE_SPEC = {
+    "mark": "line",
+    "encoding": {
+        "x": {"field": "Days ahead", "type": "quantitative", "scale": {"domain": [0, 7]}},
+        "y": {"field": "Readiness %", "type": "quantitative", "scale": {"domain": [0, 100]}},
+    },
+}
+WEEKLY_SETS_SPEC = {
+    "mark": "bar",
+    "encoding": {
+        "x": {"field": "Weighted sets", "type": "quantitative"},
+        "y": {"field": "Muscle", "type": "nominal", "sort": "-x"},
+    },
+}
+
+
 def muscle_label(muscle: str) -> str:
     """Turn 'rear_delts' into 'Rear delts', 'lower_back' into 'Lower back', etc."""
-    return muscle.replace("_", " ").title()
+    return MUSCLE_LABELS.get(muscle) or muscle.replace("_", " ").title()
+
+
+def classify_muscles(readiness: np.ndarray) -> np.ndarray:
+    """classify_muscle for a whole array of readiness values in one np.searchsorted."""
+    labels = np.array(MUSCLE_STATUS_LABELS)[
+        np.searchsorted(MUSCLE_STATUS_EDGES, readiness, side="right")
+    ]
+    return np.where(readiness == 0, MUSCLE_STATUS_DESTROYED, labels)
+
+
+@st.cache_resource
+def exercise_muscle_weights() -> pd.DataFrame:
+    """
+    Exercise x muscle matrix of the History tab's set weighting:
+    primary = 1.0, secondary = 0.5, tertiary = 0.25, 0 if not involved.
+    Static, so it's built once per process and shared (don't mutate it).
+    """
+    weights = pd.DataFrame(0.0, index=list(EXERCISES), columns=MUSCLES)
+    for ex_id, ex in EXERCISES.items():
+        for key, w in (("primary", 1.0), ("secondary", 0.5), ("tertiary", 0.25)):
+            for m in ex.get(key, []):
+                if m in weights.columns:  # muscles outside MUSCLES drop out
+                    weights.at[ex_id, m] += w
+    return weights
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_readiness_curve(user_id: str, days_ahead_values: tuple, version: tuple) -> dict:
+    """
+    Cached compute_muscle_readiness_curve (all muscles, so switching the
+    selected muscle is a cache hit).
+    `version` is storage.data_version(), so logging/deleting a set invalidates it;
+    the ttl keeps "now" from drifting too far while nothing is logged.
+    """
+    return compute_muscle_readiness_curve(user_id, days_ahead_values)
+
+
+@st.cache_data(show_spinner=False)
+def recent_sets_table(user_id: str, version: tuple, limit: int = 20) -> pd.DataFrame:
+    """
+    Display table of the user's newest sets (ID column kept for deleting).
+    `version` is storage.data_version(), so logging/deleting a set invalidates it.
+    """
+    return pd.DataFrame(
+        [
+            {
+                "ID": s.get("id", ""),
+                "Time": s["timestamp"],
+                "Exercise": EXERCISE_NAMES.get(s["exercise_id"], s["exercise_id"]),
+                "Reps": s["reps"],
+                "Weight": s["weight"],
+                "RIR": s["rir"],
+            }
+            for s in get_sets_for_user(user_id, limit=limit)
+        ]
+    )
 
 
 def login_screen():
@@ -55,11 +155,6 @@ def login_screen():
                 st.error("Invalid username or password.")
 
 
-st.set_page_config(
-    page_title="Muscle Recovery Dashboard",
-    layout="wide",
-)
-
 # ---- AUTH GATE ---- #
 
 if "user_id" not in st.session_state:
@@ -77,8 +172,7 @@ if USER_ID in ADMIN_USERS:
     st.sidebar.markdown("### Admin tools")
     st.sidebar.markdown("**View data for user:**")
 
-    users_data = _load_users()
-    usernames = [u.get("username") for u in users_data.get("users", [])]
+    usernames = list_usernames()
 
     if usernames:
         default_idx = usernames.index(USER_ID) if USER_ID in usernames else 0
@@ -108,15 +202,12 @@ st.sidebar.title("Log data")
 
 st.sidebar.subheader("Log a set")
 
-# build options like "Bench Press (bench_press)"
-exercise_options = {
-    f"{ex['name']} ({ex_id})": ex_id for ex_id, ex in EXERCISES.items()
-}
+# options like "Bench Press (bench_press)", built once in model.py
 selected_label = st.sidebar.selectbox(
     "Exercise",
-    options=sorted(exercise_options.keys()),
+    options=EXERCISE_LABELS_SORTED,
 )
-selected_ex_id = exercise_options[selected_label]
+selected_ex_id = EXERCISE_LABELS[selected_label]
 
 reps = st.sidebar.number_input(
     "Reps",
@@ -167,10 +258,40 @@ if st.sidebar.button("Add set"):
 
 tab_dashboard, tab_history = st.tabs(["Dashboard", "History"])
 
+
 # =========================================================
 # DASHBOARD TAB
 # =========================================================
-with tab_dashboard:
+@st.fragment
+def render_recovery_curve(user_id: str) -> None:
+    """Recovery curve for one muscle; picking another muscle only reruns this."""
+    st.subheader("Recovery curve (next 7 days)")
+
+    selected_muscle = st.selectbox(
+        "Select muscle to visualize",
+        options=MUSCLES,
+        key="curve_muscle_select",
+    )
+
+    # days ahead: 0, 0.5, 1.0, ..., 7.0
+    curve = cached_readiness_curve(user_id, CURVE_DAYS_AHEAD, data_version())
+    df_curve = pd.DataFrame(
+        {
+            "Days ahead": CURVE_DAYS_AHEAD,
+            "Readiness %": curve[selected_muscle],
+        }
+    )
+
+    st.vega_lite_chart(df_curve, RECOVERY_CURVE_SPEC, use_container_width=True)
+
+
+@st.fragment
+def render_dashboard(user_id: str) -> None:
+    """
+    Everything on the Dashboard tab. As a fragment, its own widgets
+    (days-ahead slider, suggestions filter, delete picker) only rerun this
+    function instead of the whole script.
+    """
     st.title("Muscle Recovery Dashboard")
 
     # ----- Time simulation slider -----
@@ -184,10 +305,10 @@ with tab_dashboard:
     )
 
     if days_ahead == 0.0:
-        readiness = compute_current_muscle_readiness(view_user_id)
+        readiness = compute_current_muscle_readiness(user_id)
         subtitle = "Showing readiness **right now**."
     else:
-        readiness = compute_muscle_readiness_days_ahead(view_user_id, days_ahead)
+        readiness = compute_muscle_readiness_days_ahead(user_id, days_ahead)
         subtitle = (
             f"Showing readiness **{days_ahead:.1f} days** from now "
             "(assuming no new training for those muscles)."
@@ -195,35 +316,35 @@ with tab_dashboard:
 
     st.caption(subtitle)
 
+    # Muscles ordered by readiness, computed once for the summary cards and
+    # the suggestions. sorted() is stable, also with reverse=True, so equal
+    # values keep MUSCLES order.
+    muscles_sorted_fresh = sorted(MUSCLES, key=readiness.__getitem__, reverse=True)
+    muscles_sorted_tired = sorted(MUSCLES, key=readiness.__getitem__)
+
     # ----- Quick summary cards -----
-    if readiness:
-        muscles_sorted_fresh = sorted(
-            MUSCLES, key=lambda m: readiness.get(m, 100.0), reverse=True
+    most_fresh = [m for m in muscles_sorted_fresh if readiness[m] >= 80][:3]
+    most_fatigued = muscles_sorted_tired[:3]
+    avg_readiness = sum(readiness.values()) / len(readiness)
+
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        st.metric(
+            "Average readiness",
+            f"{avg_readiness:.1f}%",
         )
-        muscles_sorted_tired = sorted(
-            MUSCLES, key=lambda m: readiness.get(m, 100.0)
-        )
-
-        most_fresh = [m for m in muscles_sorted_fresh if readiness.get(m, 0) >= 80][:3]
-        most_fatigued = muscles_sorted_tired[:3]
-        avg_readiness = sum(readiness.values()) / len(readiness)
-
-        col_a, col_b, col_c = st.columns(3)
-        with col_a:
-            st.metric(
-                "Average readiness",
-                f"{avg_readiness:.1f}%",
+    with col_b:
+        st.markdown("**🟢 Most fresh muscles**")
+        if most_fresh:
+            st.markdown(
+                "\n".join(f"- {muscle_label(m)}: {readiness[m]:.1f}%" for m in most_fresh)
             )
-        with col_b:
-            st.markdown("**🟢 Most fresh muscles**")
-            for m in most_fresh:
-                st.write(f"- {muscle_label(m)}: {readiness[m]:.1f}%")
-
-        with col_c:
-            st.markdown("**🔴 Most fatigued muscles**")
-            for m in most_fatigued:
-                st.write(f"- {muscle_label(m)}: {readiness[m]:.1f}%")
 
+    with col_c:
+        st.markdown("**🔴 Most fatigued muscles**")
+        st.markdown(
+            "\n".join(f"- {muscle_label(m)}: {readiness[m]:.1f}%" for m in most_fatigued)
+        )
 
     st.markdown("---")
 
@@ -235,66 +356,24 @@ with tab_dashboard:
         # ---- MUSCLE READINESS TABLE ---- #
         st.subheader("Muscle readiness")
 
-        rows = []
-        for muscle, r in readiness.items():
-            rows.append(
-                {
-                    "Muscle": muscle_label(muscle),
-                    "Readiness %": round(r, 1),
-                    "Status": classify_muscle(r),
-                }
-            )
-
-        df = pd.DataFrame(rows)
+        # readiness has an entry for every muscle in MUSCLES
+        readiness_s = pd.Series(readiness)
+        df = pd.DataFrame(
+            {
+                "Muscle": readiness_s.index.map(MUSCLE_LABELS),
+                "Readiness %": readiness_s.round(1).values,
+                "Status": classify_muscles(readiness_s.values),
+            }
+        )
         df = df.sort_values("Readiness %")  # most fatigued at top
         st.dataframe(df, use_container_width=True)
 
         # ---- Bar chart of readiness ----
-        df_bar = df.copy()
-        chart_bar = (
-            alt.Chart(df_bar)
-            .mark_bar()
-            .encode(
-                x=alt.X("Readiness %:Q", scale=alt.Scale(domain=[0, 100])),
-                y=alt.Y("Muscle:N", sort="-x"),
-            )
-        )
-        st.altair_chart(chart_bar, use_container_width=True)
+        st.vega_lite_chart(df, READINESS_BAR_SPEC, use_container_width=True)
 
         # ---- RECOVERY CURVE FOR A SINGLE MUSCLE ---- #
-        st.subheader("Recovery curve (next 7 days)")
-
-        selected_muscle = st.selectbox(
-            "Select muscle to visualize",
-            options=MUSCLES,
-            key="curve_muscle_select",
-        )
+        render_recovery_curve(user_id)
 
-        # build a list of days ahead: 0, 0.5, 1.0, ..., 7.0
-        days_ahead_values = [round(x * 0.5, 1) for x in range(0, 15)]
-
-        curve_rows = []
-        for d in days_ahead_values:
-            r_future = compute_muscle_readiness_days_ahead(view_user_id, d)
-            curve_rows.append(
-                {
-                    "Days ahead": d,
-                    "Readiness %": r_future.get(selected_muscle, 100.0),
-                }
-            )
-
-        df_curve = pd.DataFrame(curve_rows)
-
-        chart = (
-            alt.Chart(df_curve)
-            .mark_line()
-            .encode(
-                x=alt.X("Days ahead:Q", scale=alt.Scale(domain=[0, 7])),
-                y=alt.Y("Readiness %:Q", scale=alt.Scale(domain=[0, 100])),
-            )
-        )
-
-        st.altair_chart(chart, use_container_width=True)
     # ===================== RIGHT COLUMN =====================
     with col_right:
         # ---- EXERCISE SUGGESTIONS BY MUSCLE ---- #
@@ -316,29 +395,21 @@ with tab_dashboard:
             key="suggestions_min_readiness",
         )
 
-        muscles_sorted = sorted(
-            MUSCLES,
-            key=lambda m: readiness.get(m, 100.0),
-            reverse=True,
-        )
+        # Classify every exercise once; an exercise shows up under each muscle it hits
+        ex_status = {ex_id: classify_exercise(ex_id, readiness) for ex_id in EXERCISES}
 
-        for muscle in muscles_sorted:
-            muscle_readiness = readiness.get(muscle, 100.0)
+        for muscle in muscles_sorted_fresh:
+            muscle_readiness = readiness[muscle]
             if muscle_readiness < min_readiness_for_suggestions:
                 continue
 
             muscle_status = classify_muscle(muscle_readiness)
 
-            # Collect all exercises that involve this muscle (primary / secondary / tertiary)
+            # All exercises that involve this muscle (primary / secondary / tertiary),
+            # already in name order so the buckets below come out sorted
             muscle_exercises = []
-            for ex_id, ex in EXERCISES.items():
-                if (
-                    muscle in ex.get("primary", [])
-                    or muscle in ex.get("secondary", [])
-                    or muscle in ex.get("tertiary", [])
-                ):
-                    status = classify_exercise(ex_id, readiness)
-                    muscle_exercises.append((ex["name"], status))
+            for ex_id, name in MUSCLE_TO_EXERCISES[muscle]:
+                muscle_exercises.append((name, ex_status[ex_id]))
 
             header = f"{muscle_label(muscle)} – {muscle_readiness:.1f}% ({muscle_status})"
             with st.expander(header, expanded=False):
@@ -349,61 +420,41 @@ with tab_dashboard:
                     for name, status in muscle_exercises:
                         status_buckets[status].append(name)
 
-                    st.markdown("**✅ Full power**")
-                    if status_buckets["full_power"]:
-                        for name in sorted(status_buckets["full_power"]):
-                            st.write(f"- {name}")
-                    else:
-                        st.write("_None_")
-
-                    st.markdown("**🟡 Moderate**")
-                    if status_buckets["moderate"]:
-                        for name in sorted(status_buckets["moderate"]):
-                            st.write(f"- {name}")
-                    else:
-                        st.write("_None_")
-
-                    st.markdown("**🔴 Fatigued / deprioritize**")
-                    if status_buckets["fatigued"]:
-                        for name in sorted(status_buckets["fatigued"]):
-                            st.write(f"- {name}")
-                    else:
-                        st.write("_None_")
+                    # one markdown block per bucket rather than one element per exercise
+                    for status, title in (
+                        ("full_power", "**✅ Full power**"),
+                        ("moderate", "**🟡 Moderate**"),
+                        ("fatigued", "**🔴 Fatigued / deprioritize**"),
+                    ):
+                        st.markdown(title)
+                        st.markdown(
+                            "\n".join(f"- {name}" for name in status_buckets[status])
+                            or "_None_"
+                        )
 
         st.markdown("---")
 
         # ---- RECENT SETS + DELETE ---- #
         st.subheader("Recent sets")
 
-        all_sets = [s for s in get_all_sets() if s.get("user_id") == view_user_id]
-        all_sets = sorted(all_sets, key=lambda s: s["timestamp"], reverse=True)
-        recent = all_sets[:20]
-
-        if recent:
-            set_rows = []
-            for s in recent:
-                ex = EXERCISES.get(s["exercise_id"], {"name": s["exercise_id"]})
-                set_rows.append(
-                    {
-                        "ID": s.get("id", ""),
-                        "Time": s["timestamp"],
-                        "Exercise": ex["name"],
-                        "Reps": s["reps"],
-                        "Weight": s["weight"],
-                        "RIR": s["rir"],
-                    }
-                )
+        df_sets = recent_sets_table(user_id, data_version(), limit=20)
 
-            df_sets = pd.DataFrame(set_rows)
+        if not df_sets.empty:
             st.dataframe(df_sets.drop(columns=["ID"]), use_container_width=True)
 
             st.markdown("**Delete a set**")
 
-            options = {
-                f"{row['Time']} – {row['Exercise']} ({row['Reps']}x{row['Weight']}kg @ RIR {row['RIR']})": row["ID"]
-                for row in set_rows
-                if row["ID"]
-            }
+            # Label every deletable row at once from the table above
+            deletable = df_sets[df_sets["ID"].fillna("") != ""]
+            # Int64 keeps RIR as "2" (not "2.0") next to missing values
+            rir = deletable["RIR"].astype("Int64").astype("string").fillna("None")
+            labels = (
+                deletable["Time"] + " – " + deletable["Exercise"]
+                + " (" + deletable["Reps"].astype(str)
+                + "x" + deletable["Weight"].astype(str)
+                + "kg @ RIR " + rir + ")"
+            )
+            options = dict(zip(labels, deletable["ID"]))
 
             if options:
                 selected_label = st.selectbox(
@@ -416,7 +467,7 @@ with tab_dashboard:
                 if selected_label != "(none)":
                     if st.button("Delete selected set", key="delete_button_dashboard"):
                         set_id = options[selected_label]
-                        ok = delete_set_by_id(view_user_id, set_id)
+                        ok = delete_set_by_id(user_id, set_id)
                         if ok:
                             st.success("Set deleted ✅")
                             st.rerun()
@@ -428,6 +479,10 @@ with tab_dashboard:
             st.write("No sets logged yet.")
 
 
+with tab_dashboard:
+    render_dashboard(view_user_id)
+
+
 # =========================================================
 # HISTORY TAB
 # =========================================================
@@ -435,33 +490,29 @@ with tab_history:
     st.title("History")
 
     # All sets for the currently viewed user
-    all_sets = [s for s in get_all_sets() if s.get("user_id") == view_user_id]
+    all_sets = get_sets_for_user(view_user_id)
 
     if not all_sets:
         st.info("No sets logged yet for this user.")
     else:
-        # Build per-day, per-muscle "sets" with weighting:
-        # primary = 1.0, secondary = 0.5, tertiary = 0.25
-        rows = []
-        for s in all_sets:
-            ts = datetime.fromisoformat(s["timestamp"])
-            d = ts.date()
-            ex = EXERCISES.get(s["exercise_id"])
-            if not ex:
-                continue
-
-            for m in ex.get("primary", []):
-                rows.append({"date": d, "muscle": m, "sets": 1.0})
-            for m in ex.get("secondary", []):
-                rows.append({"date": d, "muscle": m, "sets": 0.5})
-            for m in ex.get("tertiary", []):
-                rows.append({"date": d, "muscle": m, "sets": 0.25})
-
-        if not rows:
+        # Build per-day, per-muscle weighted "sets" from the static
+        # exercise x muscle weights (unknown exercise ids simply drop out)
+        df_sets = pd.DataFrame(all_sets, columns=["exercise_id", "timestamp"])
+        # Day as datetime64 (midnight), parsed in one vectorized call; no
+        # per-row Python date objects
+        df_sets["date"] = pd.to_datetime(
+            df_sets["timestamp"], format="ISO8601", cache=True
+        ).dt.normalize()
+        weights = exercise_muscle_weights()
+        df_sets = df_sets[df_sets["exercise_id"].isin(weights.index)]
+
+        if df_sets.empty:
             st.info("No muscle data found for this user's sets.")
         else:
-            df_hist = pd.DataFrame(rows)
-            df_hist = df_hist.groupby(["date", "muscle"], as_index=False)["sets"].sum()
+            # date x exercise set counts times the exercise x muscle weights
+            # gives weighted sets per date x muscle in one matrix product
+            counts = pd.crosstab(df_sets["date"], df_sets["exercise_id"])
+            df_hist = counts @ weights.loc[counts.columns]
 
             # ---- Week picker ----
             today = date.today()
@@ -472,50 +523,30 @@ with tab_history:
 
             # Monday of that week
             week_start = selected_day - timedelta(days=selected_day.weekday())
-            week_days = [week_start + timedelta(days=i) for i in range(7)]
 
             st.markdown(
                 f"### Week of {week_start.strftime('%d.%m.%Y')} "
                 f"to {(week_start + timedelta(days=6)).strftime('%d.%m.%Y')}"
             )
 
-            df_week = df_hist[df_hist["date"].isin(week_days)]
+            in_week = (df_hist.index >= pd.Timestamp(week_start)) & (
+                df_hist.index < pd.Timestamp(week_start + timedelta(days=7))
+            )
 
             st.subheader("Weekly sets per muscle (weighted)")
 
-            if df_week.empty:
-                # No sets at all this week → all muscles at 0
-                df_week_sum = pd.DataFrame(
-                    {"muscle": MUSCLES, "sets": [0.0] * len(MUSCLES)}
-                )
-            else:
-                # Sum by muscle for this week
-                df_week_sum_raw = (
-                    df_week.groupby("muscle", as_index=False)["sets"].sum()
-                )
-
-                # Ensure all muscles appear, fill missing with 0.0
-                df_week_sum = (
-                    pd.DataFrame({"muscle": MUSCLES})
-                    .merge(df_week_sum_raw, on="muscle", how="left")
-                    .fillna({"sets": 0.0})
-                )
+            # Every muscle is a column, so a week without sets just sums to 0
+            df_week_sum = pd.DataFrame(
+                {"muscle": MUSCLES, "sets": df_hist[in_week].sum().to_numpy()}
+            )
 
             # Pretty labels + bar chart + table
-            df_week_sum["Muscle"] = df_week_sum["muscle"].apply(muscle_label)
+            df_week_sum["Muscle"] = df_week_sum["muscle"].map(MUSCLE_LABELS)
             df_week_sum = df_week_sum[["Muscle", "sets"]].rename(
                 columns={"sets": "Weighted sets"}
             )
 
-            chart_week = (
-                alt.Chart(df_week_sum)
-                .mark_bar()
-                .encode(
-                    x=alt.X("Weighted sets:Q"),
-                    y=alt.Y("Muscle:N", sort="-x"),
-                )
-            )
-            st.altair_chart(chart_week, use_container_width=True)
+            st.vega_lite_chart(df_week_sum, WEEKLY_SETS_SPEC, use_container_width=True)
 
             df_week_sum = df_week_sum.sort_values("Weighted sets", ascending=False)
             st.dataframe(df_week_sum, use_container_width=True)
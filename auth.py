@@ -1,55 +1,92 @@
 # auth.py
 
-import json
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 import hashlib
+import hmac
 import os
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
+
+from storage import file_version, json_bytes, read_json_file, write_file_atomic
 
 USERS_FILE = Path(__file__).with_name("users.json")
 
 
-def _load_users() -> Dict[str, Any]:
-    if not USERS_FILE.exists():
-        return {"users": []}
-    text = USERS_FILE.read_text(encoding="utf-8")
-    if not text.strip():
-        return {"users": []}
-    return json.loads(text)
+def _read_users() -> Dict[str, Any]:
+    return read_json_file(USERS_FILE, {"users": []})
+
+
+def _users_version() -> Tuple[int, int, int]:
+    """storage.file_version of users.json, used as a cache key."""
+    return file_version(USERS_FILE)
+
+
+@lru_cache(maxsize=1)
+def _load_users_cached(version: Tuple[int, int, int]) -> Dict[str, Any]:
+    return _read_users()
+
+
+@lru_cache(maxsize=1)
+def _users_by_name(version: Tuple[int, int, int]) -> Dict[str, Dict[str, Any]]:
+    """{username: user record}, rebuilt only when users.json changes."""
+    return {u.get("username"): u for u in _load_users_cached(version)["users"]}
+
+
+def list_usernames() -> List[str]:
+    """All usernames, in signup order."""
+    return list(_users_by_name(_users_version()))
 
 
 def _save_users(data: Dict[str, Any]) -> None:
-    USERS_FILE.write_text(
-        json.dumps(data, indent=2, ensure_ascii=False),
-        encoding="utf-8",
-    )
+    write_file_atomic(USERS_FILE, json_bytes(data))
+
+
+# PBKDF2 work factor for new hashes. It is stored inside each hash, so it can
+# be raised later without breaking logins for existing users.
+PBKDF2_ITERATIONS = 100_000
+HASH_PREFIX = "pbkdf2_sha256"
 
 
 def _hash_password(password: str, salt: bytes = None) -> str:
     """
     Hash password with PBKDF2-HMAC-SHA256 + random salt.
-    Stored format: HEX_SALT:HEX_HASH
+    Stored format: pbkdf2_sha256$ITERATIONS$HEX_SALT$HEX_HASH
     """
     if salt is None:
         salt = os.urandom(16)
     pwd_hash = hashlib.pbkdf2_hmac(
-        "sha256", password.encode("utf-8"), salt, 100_000
+        "sha256", password.encode("utf-8"), salt, PBKDF2_ITERATIONS
     )
-    return f"{salt.hex()}:{pwd_hash.hex()}"
+    return f"{HASH_PREFIX}${PBKDF2_ITERATIONS}${salt.hex()}${pwd_hash.hex()}"
+
+
+def _parse_stored_hash(stored: str) -> Tuple[int, bytes, bytes]:
+    """
+    Split a stored hash into (iterations, salt, expected_hash).
+    Also accepts the old HEX_SALT:HEX_HASH format (always 100_000 iterations).
+    Raises ValueError if it's neither, or if the iteration count is below 1.
+    """
+    if stored.startswith(HASH_PREFIX + "$"):
+        _, iterations, salt_hex, hash_hex = stored.split("$")
+        iterations = int(iterations)
+        if iterations < 1:
+            raise ValueError("iteration count must be at least 1")
+        return iterations, bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
+    salt_hex, hash_hex = stored.split(":")
+    return 100_000, bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
 
 
 def _verify_password(password: str, stored: str) -> bool:
     try:
-        salt_hex, hash_hex = stored.split(":")
+        iterations, salt, expected_hash = _parse_stored_hash(stored)
     except ValueError:
         return False
-    salt = bytes.fromhex(salt_hex)
-    expected_hash = bytes.fromhex(hash_hex)
     pwd_hash = hashlib.pbkdf2_hmac(
-        "sha256", password.encode("utf-8"), salt, 100_000
+        "sha256", password.encode("utf-8"), salt, iterations
     )
-    return pwd_hash == expected_hash
+    # constant-time compare, so response time doesn't leak how much matched
+    return hmac.compare_digest(pwd_hash, expected_hash)
 
 
 def create_user(username: str, password: str) -> Tuple[bool, str]:
@@ -64,11 +101,11 @@ def create_user(username: str, password: str) -> Tuple[bool, str]:
     if len(password) < 6:
         return False, "Password must be at least 6 characters."
 
-    data = _load_users()
-    for u in data["users"]:
-        if u.get("username") == username:
-            return False, "Username already exists."
+    if username in _users_by_name(_users_version()):
+        return False, "Username already exists."
 
+    # fresh read: the cached copy is shared and must not be appended to
+    data = _read_users()
     pwd_hash = _hash_password(password)
     data["users"].append(
         {
@@ -89,9 +126,8 @@ def verify_user(username: str, password: str) -> bool:
     if not username:
         return False
 
-    data = _load_users()
-    for u in data["users"]:
-        if u.get("username") == username:
-            stored = u.get("password_hash", "")
-            return _verify_password(password, stored)
-    return False
+    u = _users_by_name(_users_version()).get(username)
+    if u is None:
+        return False
+    stored = u.get("password_hash", "")
+    return _verify_password(password, stored)
@@ -425,3 +425,37 @@ EXERCISES = {
         "sfr": 3.0,
     },
 }
+
+
+# Reverse lookup: muscle -> [(exercise_id, exercise_name), ...] for every
+# exercise that hits it as primary, secondary or tertiary, sorted by name.
+# Built once at import so the UI doesn't rescan EXERCISES per muscle.
+def _muscle_to_exercises():
+    by_muscle = {m: [] for m in MUSCLES}
+    for ex_id, ex in sorted(EXERCISES.items(), key=lambda kv: kv[1]["name"]):
+        involved = (
+            set(ex.get("primary", []))
+            | set(ex.get("secondary", []))
+            | set(ex.get("tertiary", []))
+        )
+        for m in involved:
+            by_muscle.setdefault(m, []).append((ex_id, ex["name"]))
+    return by_muscle
+
+
+MUSCLE_TO_EXERCISES = _muscle_to_exercises()
+
+# exercise id -> display name
+EXERCISE_NAMES = {ex_id: ex["name"] for ex_id, ex in EXERCISES.items()}
+
+# Sidebar selectbox labels like "Bench Press (bench_press)" -> exercise id,
+# plus the labels pre-sorted for display.
+EXERCISE_LABELS = {f"{ex['name']} ({ex_id})": ex_id for ex_id, ex in EXERCISES.items()}
+EXERCISE_LABELS_SORTED = sorted(EXERCISE_LABELS)
+
+# muscle id -> display label, e.g. "rear_delts" -> "Rear Delts"
+MUSCLE_LABELS = {m: m.replace("_", " ").title() for m in MUSCLES}
+
+# muscle id -> its position in MUSCLES, for code that keeps per-muscle
+# values in plain lists instead of dicts
+MUSCLE_INDEX = {m: i for i, m in enumerate(MUSCLES)}
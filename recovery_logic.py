@@ -4,7 +4,7 @@
 Recovery / fatigue math.
 
 Takes:
-- logged sets (from storage.get_all_sets)
+- logged sets (from storage.get_sets_by_user)
 - daily sleep + steps (from storage.get_all_daily)
 
 Outputs:
@@ -12,13 +12,15 @@ Outputs:
 - classification for muscles (fresh / slightly_fatigued / fatigued)
 - classification for exercises (full_power / moderate / fatigued)
 """
-from collections import defaultdict
+from bisect import bisect_right
 from datetime import datetime, timedelta
+from functools import lru_cache
 from math import exp, log
-from typing import Dict, Optional
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from model import EXERCISES, MUSCLES
-from storage import get_all_sets
+from model import EXERCISES, MUSCLE_INDEX, MUSCLES
+from storage import data_version, get_sets_by_user
 
 # ---- Recovery parameters ----
 
@@ -64,34 +66,73 @@ def get_half_life_days(muscle: str) -> float:
     return MUSCLE_HALF_LIFE_DAYS.get(muscle, DEFAULT_HALF_LIFE_DAYS)
 
 
+# Per-muscle recovery rate log(2) / half-life (per day), worked out once
+BASE_LAMBDA = {m: log(2.0) / get_half_life_days(m) for m in MUSCLES}
+
+# Per exercise: (muscle index in MUSCLES, weight, recovery rate) for every
+# muscle it hits; primary = 1.0, secondary = 0.5, tertiary = 0.25.
+# Muscles outside MUSCLES never show up in readiness, so they're left out.
+EXERCISE_MUSCLE_TERMS = {
+    ex_id: tuple(
+        (MUSCLE_INDEX[m], w, BASE_LAMBDA[m])
+        for key, w in (("primary", 1.0), ("secondary", 0.5), ("tertiary", 0.25))
+        for m in ex.get(key, [])
+        if m in MUSCLE_INDEX
+    )
+    for ex_id, ex in EXERCISES.items()
+}
+
+
 # After this many days, any session is treated as fully recovered
 RECOVERY_HORIZON_DAYS = 5.0
 
+# Points of the "next 7 days" recovery curve: 0, 0.5, 1.0, ..., 7.0
+CURVE_DAYS_AHEAD = tuple(round(x * 0.5, 1) for x in range(0, 15))
+
 
 # ---- Helper functions ----
 
+# Effort multiplier for the usual RIR values (None = RIR not tracked)
+RIR_EFFORT = {None: 0.7, 0: 1.2, 1: 1.0, 2: 0.8, 3: 0.6, 4: 0.4}
+
+
 def effort_multiplier_from_rir(rir: Optional[int]) -> float:
     """Map RIR to how hard the set was."""
-    if rir is None:
-        return 0.7
+    effort = RIR_EFFORT.get(rir)
+    if effort is not None:
+        return effort
+    # outside the table: 5+ RIR, negative RIR, or a fractional value
     if rir >= 4:
         return 0.4
-    if rir == 3:
-        return 0.6
-    if rir == 2:
-        return 0.8
-    if rir == 1:
-        return 1.0
     if rir <= 0:
         return 1.2
     return 0.7
 
 
+# Readiness bands for classify_muscle, highest first: (minimum readiness, label).
+# Below the last band a muscle is VERY FATIGUED, and exactly 0 is DESTROYED.
+MUSCLE_STATUS_BANDS = (
+    (95.0, "🟢 FULLY FRESH"),
+    (80.0, "🟢 ALMOST FRESH"),
+    (60.0, "🟡 SLIGHTLY FATIGUED"),
+    (40.0, "🟠 MODERATLY FATIGUED"),
+)
+MUSCLE_STATUS_DESTROYED = "💀 YOU DESTROYED THIS MUSCLE"
+MUSCLE_STATUS_VERY_FATIGUED = "🔴 VERY FATIGUED"
+
+# The same bands as a sorted lookup table (bisect / np.searchsorted):
+# MUSCLE_STATUS_LABELS[number of edges <= readiness]
+MUSCLE_STATUS_EDGES = tuple(threshold for threshold, _ in reversed(MUSCLE_STATUS_BANDS))
+MUSCLE_STATUS_LABELS = (MUSCLE_STATUS_VERY_FATIGUED,) + tuple(
+    label for _, label in reversed(MUSCLE_STATUS_BANDS)
+)
+
+
 def classify_muscle(readiness: float) -> str:
     """
     Turn a readiness % into a descriptive label with emojis.
 
-    Bands:
+    Bands (see MUSCLE_STATUS_BANDS):
     - 95–100: 🟢 FULLY FRESH
     - 80–94.9: 🟢 ALMOST FRESH
     - 60–79.9: 🟡 SLIGHTLY FATIGUED
@@ -99,58 +140,43 @@ def classify_muscle(readiness: float) -> str:
     - 0: 💀 YOU DESTROYED THIS MUSCLE
     - 0.1–39.9: 🔴 VERY FATIGUED
     """
-    if readiness >= 95:
-        return "🟢 FULLY FRESH"
-    if readiness >= 80:
-        return "🟢 ALMOST FRESH"
-    if readiness >= 60:
-        return "🟡 SLIGHTLY FATIGUED"
-    if readiness >= 40:
-        return "🟠 MODERATLY FATIGUED"
     if readiness == 0:
-        return "💀 YOU DESTROYED THIS MUSCLE"
-    return "🔴 VERY FATIGUED"
+        return MUSCLE_STATUS_DESTROYED
+    return MUSCLE_STATUS_LABELS[bisect_right(MUSCLE_STATUS_EDGES, readiness)]
 
 
 # ---- Core readiness computation ----
-def compute_current_muscle_readiness(
-    user_id: str,
-    as_of: Optional[datetime] = None,
-) -> Dict[str, float]:
-    """
-    Return {muscle_name: readiness_percent} for the given user,
-    as of a given time. If as_of is None, use current time.
 
-    Readiness is 100 - fatigue, clamped 0–100, with tiny fatigue treated as 0.
-    Sleep/steps are NOT used anymore. Fatigue per set is based on:
-    - RIR (effort)
-    - SFR (exercise stimulus-to-fatigue)
-    - gentle volume/load factor (reps * weight)
-    - primary vs secondary muscles
-    - per-muscle half-life
-    - a 5-day hard recovery horizon
-    """
-    if as_of is None:
-        as_of = datetime.now()
+# Set times are kept as integer microseconds since this (naive) epoch, so
+# "time since the set" is an int subtraction instead of datetime arithmetic
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
 
-    # Only this user's sets
-    sets = [s for s in get_all_sets() if s.get("user_id") == user_id]
 
-    # accumulate fatigue per muscle
-    fatigue = defaultdict(float)
+def _to_us(dt: datetime) -> int:
+    return (dt - _EPOCH) // _ONE_US
 
-    for s in sets:
-        # When did this set happen?
-        ts = datetime.fromisoformat(s["timestamp"])
-        days_since = (as_of - ts).total_seconds() / 86400.0
 
-        # Skip weird future timestamps
-        if days_since < 0:
-            continue
+RECOVERY_HORIZON_US = round(RECOVERY_HORIZON_DAYS * 86400 * 1_000_000)
 
-        # Hard recovery horizon: ignore sets older than RECOVERY_HORIZON_DAYS
-        if days_since >= RECOVERY_HORIZON_DAYS:
-            continue
+
+def _set_fatigue_terms(
+    sets: List[Dict],
+) -> Tuple[List[int], List[List[Tuple[int, float, float]]]]:
+    """
+    Turn raw logged sets into two parallel lists, sorted by set time:
+    - set timestamps in µs
+    - per set, [(muscle index in MUSCLES, fatigue, decay rate), ...] with the
+      per-muscle decay rate log(2) / half-life already worked out
+
+    Everything here is independent of the "as of" time, so it can be done
+    once and then decayed to as many points in time as needed.
+    """
+    terms = []
+
+    for s in sets:
+        # When did this set happen?
+        ts = _to_us(datetime.fromisoformat(s["timestamp"]))
 
         ex_id = s["exercise_id"]
         ex = EXERCISES.get(ex_id)
@@ -193,32 +219,59 @@ def compute_current_muscle_readiness(
         # Base "size" of this set before decay
         base_set_fatigue = effort_mult * fatigue_factor * work_factor
 
-        # Primary and secondary muscles, with their weights
-        muscles_and_weights = (
-            [(m, 1.0) for m in ex.get("primary", [])] +
-            [(m, 0.5) for m in ex.get("secondary", [])] +
-            [(m, 0.25) for m in ex.get("tertiary", [])]
-         )
+        # Spread over the exercise's muscles by weight, each with its recovery rate
+        terms.append(
+            (
+                ts,
+                [
+                    (m_idx, base_set_fatigue * w, base_lambda)
+                    for m_idx, w, base_lambda in EXERCISE_MUSCLE_TERMS[ex_id]
+                ],
+            )
+        )
+
+    # sorted by time so readiness can binary-search the recovery window
+    terms.sort(key=itemgetter(0))
+    return [ts for ts, _ in terms], [muscle_fatigue for _, muscle_fatigue in terms]
+
+
+def _readiness_from_terms(
+    terms: Tuple[List[int], List[List[Tuple[int, float, float]]]],
+    as_of: datetime,
+) -> Dict[str, float]:
+    """Decay precomputed set fatigue to `as_of` and convert it to readiness 0–100."""
+    times, per_set = terms
+    as_of_us = _to_us(as_of)
+
+    # Only sets in (as_of - horizon, as_of] count: anything older is past the
+    # hard recovery horizon, anything later is a weird future timestamp
+    lo = bisect_right(times, as_of_us - RECOVERY_HORIZON_US)
+    hi = bisect_right(times, as_of_us)
 
+    # accumulate fatigue per muscle, indexed like MUSCLES
+    fatigue = [0.0] * len(MUSCLES)
 
-        for muscle, weight_factor in muscles_and_weights:
-            # per-muscle half-life → recovery rate
-            half_life = get_half_life_days(muscle)
-            base_lambda = log(2.0) / half_life
+    for ts, muscle_fatigue in zip(times[lo:hi], per_set[lo:hi]):
+        # µs → s → days (same rounding as timedelta.total_seconds() / 86400)
+        days_since = (as_of_us - ts) / 1e6 / 86400.0
 
+        for muscle, set_fatigue, base_lambda in muscle_fatigue:
             # Simple exponential decay from training day to "as_of"
             decay = exp(-base_lambda * days_since)
 
-            contrib_now = base_set_fatigue * weight_factor * decay
+            contrib_now = set_fatigue * decay
             fatigue[muscle] += contrib_now
 
-    # convert raw fatigue → readiness 0–100
+    return _fatigue_to_readiness(fatigue)
+
+
+def _fatigue_to_readiness(fatigue: List[float]) -> Dict[str, float]:
+    """Convert raw fatigue (indexed like MUSCLES) → readiness 0–100."""
     readiness: Dict[str, float] = {}
     SCALE_PER_UNIT = 50.0  # tune overall "aggressiveness"
     EPS = 10.0              # % fatigue: treat less than this as fully recovered
 
-    for m in MUSCLES:
-        raw = fatigue[m]
+    for m, raw in zip(MUSCLES, fatigue):
         scaled_fatigue = raw * SCALE_PER_UNIT
 
         # If fatigue is tiny, treat as fully recovered
@@ -233,15 +286,147 @@ def compute_current_muscle_readiness(
     return readiness
 
 
+def _user_sets(user_id: str, version: Tuple[int, int, int]) -> List[Dict]:
+    """Only this user's sets, as of storage version `version`."""
+    return get_sets_by_user(version).get(user_id, [])
+
+
+@lru_cache(maxsize=32)
+def _user_fatigue_terms(
+    user_id: str,
+    version: Tuple[int, int, int],
+) -> Tuple[List[int], List[List[Tuple[int, float, float]]]]:
+    """_set_fatigue_terms for this user's sets, memoized per storage.data_version()."""
+    return _set_fatigue_terms(_user_sets(user_id, version))
+
+
+# "now" is rounded up to the next multiple of this many seconds for readiness,
+# so repeated calls in quick succession (reruns, slider drags) share one
+# cached result
+NOW_BUCKET_SECONDS = 10
+
+
+def _now_bucket() -> datetime:
+    """
+    datetime.now() rounded up to the next NOW_BUCKET_SECONDS boundary.
+    Up, not down: a set logged a moment ago must not look like it's in the future.
+    """
+    now = datetime.now()
+    floor = now.replace(
+        second=now.second - now.second % NOW_BUCKET_SECONDS, microsecond=0
+    )
+    return floor + timedelta(seconds=NOW_BUCKET_SECONDS)
+
+
+@lru_cache(maxsize=64)
+def _readiness_cached(
+    user_id: str,
+    version: Tuple[int, int, int],
+    as_of: datetime,
+) -> Dict[str, float]:
+    """Readiness memoized per (user, storage.data_version(), as_of). Shared: copy before handing out."""
+    return _readiness_from_terms(_user_fatigue_terms(user_id, version), as_of)
+
+
+def compute_current_muscle_readiness(
+    user_id: str,
+    as_of: Optional[datetime] = None,
+) -> Dict[str, float]:
+    """
+    Return {muscle_name: readiness_percent} for the given user,
+    as of a given time. If as_of is None, use current time.
+
+    Readiness is 100 - fatigue, clamped 0–100, with tiny fatigue treated as 0.
+    Sleep/steps are NOT used anymore. Fatigue per set is based on:
+    - RIR (effort)
+    - SFR (exercise stimulus-to-fatigue)
+    - gentle volume/load factor (reps * weight)
+    - primary vs secondary muscles
+    - per-muscle half-life
+    - a 5-day hard recovery horizon
+
+    "Current time" is rounded up to NOW_BUCKET_SECONDS; results are cached
+    until data.json changes.
+    """
+    if as_of is None:
+        as_of = _now_bucket()
+
+    return dict(_readiness_cached(user_id, data_version(), as_of))
+
 
 def compute_muscle_readiness_days_ahead(user_id: str, days_ahead: float) -> Dict[str, float]:
     """
     Convenience helper: readiness as if 'days_ahead' days have passed.
     """
-    as_of = datetime.now() + timedelta(days=days_ahead)
+    as_of = _now_bucket() + timedelta(days=days_ahead)
     return compute_current_muscle_readiness(user_id, as_of=as_of)
 
 
+def compute_muscle_readiness_curve(
+    user_id: str,
+    days_ahead_values: Sequence[float] = CURVE_DAYS_AHEAD,
+) -> Dict[str, List[float]]:
+    """
+    Readiness for several 'days ahead' points at once:
+    {muscle_name: [readiness at days_ahead_values[0], ...]}.
+
+    Sets are read and preprocessed once, and each set's fatigue is decayed
+    to "now" once. A point d days ahead then only needs the per-muscle
+    factor exp(-rate * d), shared by every set:
+    exp(-rate * (days_since + d)) = exp(-rate * days_since) * exp(-rate * d).
+    """
+    now = _now_bucket()
+    now_us = _to_us(now)
+    times, per_set = _user_fatigue_terms(user_id, data_version())
+    points_us = [_to_us(now + timedelta(days=d)) for d in days_ahead_values]
+
+    curve: Dict[str, List[float]] = {m: [] for m in MUSCLES}
+    if not points_us:
+        return curve
+
+    # Sets inside the recovery window of at least one point, decayed to now
+    lo = bisect_right(times, min(points_us) - RECOVERY_HORIZON_US)
+    hi = bisect_right(times, max(points_us))
+    window_times = times[lo:hi]
+    decayed_to_now = []
+    for ts, muscle_fatigue in zip(window_times, per_set[lo:hi]):
+        days_since = (now_us - ts) / 1e6 / 86400.0
+        decayed_to_now.append(
+            [
+                (muscle, set_fatigue * exp(-base_lambda * days_since))
+                for muscle, set_fatigue, base_lambda in muscle_fatigue
+            ]
+        )
+
+    for d, as_of_us in zip(days_ahead_values, points_us):
+        decay_ahead = [exp(-BASE_LAMBDA[m] * d) for m in MUSCLES]
+
+        # same (as_of - horizon, as_of] window as _readiness_from_terms
+        a = bisect_right(window_times, as_of_us - RECOVERY_HORIZON_US)
+        b = bisect_right(window_times, as_of_us)
+
+        fatigue = [0.0] * len(MUSCLES)
+        for muscle_fatigue in decayed_to_now[a:b]:
+            for muscle, contrib_now in muscle_fatigue:
+                fatigue[muscle] += contrib_now * decay_ahead[muscle]
+
+        readiness = _fatigue_to_readiness(fatigue)
+        for m in MUSCLES:
+            curve[m].append(readiness[m])
+    return curve
+
+
+# exercise id -> (primary, secondary, tertiary) muscles, frozen once for classify_exercise
+EXERCISE_ROLES = {
+    ex_id: (
+        tuple(ex.get("primary", [])),
+        tuple(ex.get("secondary", [])),
+        tuple(ex.get("tertiary", [])),
+    )
+    for ex_id, ex in EXERCISES.items()
+}
+
+
 def classify_exercise(exercise_id: str, muscle_readiness: Dict[str, float]) -> str:
     """
     Classify an exercise based on its involved muscles' readiness:
@@ -251,22 +436,20 @@ def classify_exercise(exercise_id: str, muscle_readiness: Dict[str, float]) -> s
 
     Primaries gate the hardest, secondaries a bit looser, tertiaries loosest.
     """
-    ex = EXERCISES[exercise_id]
-    prim = ex.get("primary", [])
-    sec = ex.get("secondary", [])
-    tert = ex.get("tertiary", [])
+    prim, sec, tert = EXERCISE_ROLES[exercise_id]
+    get = muscle_readiness.get
 
     # FULL POWER: primaries very ready, secondaries ok, tertiaries can be a bit tired
-    prim_ready_full = all(muscle_readiness.get(m, 100.0) >= 80.0 for m in prim)
-    sec_ready_full = all(muscle_readiness.get(m, 100.0) >= 60.0 for m in sec)
-    tert_ready_full = all(muscle_readiness.get(m, 100.0) >= 50.0 for m in tert)
+    prim_ready_full = all(get(m, 100.0) >= 80.0 for m in prim)
+    sec_ready_full = all(get(m, 100.0) >= 60.0 for m in sec)
+    tert_ready_full = all(get(m, 100.0) >= 50.0 for m in tert)
     if prim_ready_full and sec_ready_full and tert_ready_full:
         return "full_power"
 
     # MODERATE: primaries not trashed, secondaries/tertiaries can be more tired
-    prim_ready_mod = all(muscle_readiness.get(m, 100.0) >= 60.0 for m in prim)
-    sec_ready_mod = all(muscle_readiness.get(m, 100.0) >= 50.0 for m in sec)
-    tert_ready_mod = all(muscle_readiness.get(m, 100.0) >= 40.0 for m in tert)
+    prim_ready_mod = all(get(m, 100.0) >= 60.0 for m in prim)
+    sec_ready_mod = all(get(m, 100.0) >= 50.0 for m in sec)
+    tert_ready_mod = all(get(m, 100.0) >= 40.0 for m in tert)
     if prim_ready_mod and sec_ready_mod and tert_ready_mod:
         return "moderate"
 
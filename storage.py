@@ -28,31 +28,132 @@ Structure:
       ...
   ]
 }
+
+Reads are memoized on data_version(), so anything they return (and
+anything cached on that key elsewhere, e.g. in recovery_logic and auth)
+is shared between callers: read it, don't mutate it.
 """
 import json
+import os
+import tempfile
 import uuid
+from functools import lru_cache
+from heapq import nlargest, nsmallest
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    # optional: several times faster JSON parsing/serializing
+    import orjson
+except ImportError:
+    orjson = None
 
 # data.json will live in the same folder as this file
 DATA_FILE = Path(__file__).with_name("data.json")
 
 
+def read_json_file(path: Path, empty: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse the JSON file at `path`; `empty` if it's missing or blank."""
+    if not path.exists():
+        return empty
+    raw = path.read_bytes()
+    if not raw.strip():
+        return empty
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # e.g. NaN/Infinity, which the json module writes but orjson rejects
+            pass
+    return json.loads(raw.decode("utf-8"))
+
+
+def json_bytes(data: Dict[str, Any]) -> bytes:
+    """`data` serialized for read_json_file / write_file_atomic."""
+    # compact: these files are only read by this app, and no indentation
+    # means fewer bytes to write now and to read back on the next load
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            # e.g. ints wider than 64 bits, which the json module handles
+            pass
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
 def _load_data() -> Dict[str, Any]:
-    if not DATA_FILE.exists():
-        return {"sets": [], "daily": []}
-    text = DATA_FILE.read_text(encoding="utf-8")
-    if not text.strip():
-        return {"sets": [], "daily": []}
-    return json.loads(text)
+    return read_json_file(DATA_FILE, {"sets": [], "daily": []})
 
 
-def _save_data(data: Dict[str, Any]) -> None:
-    DATA_FILE.write_text(
-        json.dumps(data, indent=2, ensure_ascii=False),
-        encoding="utf-8",
+@lru_cache(maxsize=1)
+def _load_data_cached(version: Tuple[int, int, int]) -> Dict[str, Any]:
+    """_load_data() memoized on data_version(), so an unchanged file is parsed once."""
+    return _load_data()
+
+
+def _load_data_for_write() -> Dict[str, Any]:
+    """
+    Current data for a writer, taken from the memoized parse instead of
+    re-reading the file. The top-level lists are copies, so appending to or
+    filtering them leaves the shared cache alone; don't modify the records.
+    """
+    data = dict(_load_data_cached(data_version()))
+    data["sets"] = list(data.get("sets", []))
+    data["daily"] = list(data.get("daily", []))
+    return data
+
+
+def write_file_atomic(path: Path, payload: bytes) -> None:
+    """
+    Replace `path` with `payload` without ever leaving a half-written file:
+    write a temp file next to it, fsync, then rename it over the original.
+    """
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=path.name + ".", suffix=".tmp"
     )
+    try:
+        # fdopen first so the file object owns (and always closes) the fd
+        with os.fdopen(fd, "wb") as f:
+            if path.exists():
+                os.fchmod(f.fileno(), path.stat().st_mode & 0o777)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _save_data(data: Dict[str, Any]) -> None:
+    write_file_atomic(DATA_FILE, json_bytes(data))
+
+
+def _set_record(
+    user_id: str,
+    exercise_id: str,
+    reps: int,
+    weight: float,
+    rir: Optional[int],
+    timestamp: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Build the dict we store for one set (see module docstring)."""
+    if timestamp is None:
+        timestamp = datetime.now()
+
+    set_id = uuid.uuid4().hex  # unique id for this set
+
+    return {
+        "id": set_id,
+        "user_id": user_id,
+        "exercise_id": exercise_id,
+        "reps": int(reps),
+        "weight": float(weight),
+        "rir": int(rir) if rir is not None else None,
+        "timestamp": timestamp.isoformat(),
+    }
 
 
 def log_set(
@@ -68,28 +169,36 @@ def log_set(
     - rir can be None if you didn't track it.
     - timestamp can be given, or defaults to now().
     """
-    if timestamp is None:
-        timestamp = datetime.now()
-
-    data = _load_data()
-    data.setdefault("sets", [])
-
-    set_id = uuid.uuid4().hex  # unique id for this set
-
+    data = _load_data_for_write()
     data["sets"].append(
-        {
-            "id": set_id,
-            "user_id": user_id,
-            "exercise_id": exercise_id,
-            "reps": int(reps),
-            "weight": float(weight),
-            "rir": int(rir) if rir is not None else None,
-            "timestamp": timestamp.isoformat(),
-        }
+        _set_record(user_id, exercise_id, reps, weight, rir, timestamp)
     )
     _save_data(data)
 
 
+def log_sets_bulk(user_id: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    Append several sets for this user with a single read + write of data.json.
+    Each row has the log_set arguments: exercise_id, reps, weight, rir
+    and optionally timestamp.
+    """
+    if not rows:
+        return
+
+    data = _load_data_for_write()
+    for row in rows:
+        data["sets"].append(
+            _set_record(
+                user_id,
+                row["exercise_id"],
+                row["reps"],
+                row["weight"],
+                row.get("rir"),
+                row.get("timestamp"),
+            )
+        )
+    _save_data(data)
+
 
 def log_daily_recovery(
     user_id: str,
@@ -100,8 +209,7 @@ def log_daily_recovery(
     Store sleep + steps for *today* for this user.
     If there's already an entry for today, overwrite it.
     """
-    data = _load_data()
-    data.setdefault("daily", [])
+    data = _load_data_for_write()
     today = datetime.now().date().isoformat()
 
     # remove existing entry for this user & date
@@ -122,13 +230,72 @@ def log_daily_recovery(
     _save_data(data)
 
 
+def file_version(path: Path) -> Tuple[int, int, int]:
+    """
+    (mtime in ns, size in bytes, inode) of `path`, or (0, 0, 0) if it's missing.
+    Every write goes through os.replace and so gets a new inode, which catches
+    a same-size rewrite within one mtime tick.
+    """
+    if not path.exists():
+        return (0, 0, 0)
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def data_version() -> Tuple[int, int, int]:
+    """
+    Cheap fingerprint of data.json: (mtime in ns, size in bytes, inode).
+    Changes on every write, so callers can use it as a cache key.
+    """
+    return file_version(DATA_FILE)
+
+
 def get_all_sets() -> List[Dict[str, Any]]:
-    data = _load_data()
+    data = _load_data_cached(data_version())
     return data.get("sets", [])
 
 
+@lru_cache(maxsize=1)
+def _sets_by_user_cached(version: Tuple[int, int, int]) -> Dict[str, List[Dict[str, Any]]]:
+    """Sets grouped by user_id (file order kept), built in one pass per data version."""
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    for s in _load_data_cached(version).get("sets", []):
+        by_user.setdefault(s.get("user_id"), []).append(s)
+    return by_user
+
+
+def get_sets_by_user(
+    version: Optional[Tuple[int, int, int]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {user_id: that user's sets}, in file order.
+    - version: a data_version() the caller already holds (default: the current one).
+    """
+    if version is None:
+        version = data_version()
+    return _sets_by_user_cached(version)
+
+
+def get_sets_for_user(
+    user_id: str,
+    limit: Optional[int] = None,
+    order_desc: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    This user's sets, sorted by timestamp (newest first by default).
+    - limit: only return the first `limit` sets after sorting.
+    """
+    sets = get_sets_by_user().get(user_id, [])
+    by_time = itemgetter("timestamp")
+    if limit is not None:
+        # partial sort: O(N log limit) instead of sorting everything
+        pick = nlargest if order_desc else nsmallest
+        return pick(limit, sets, key=by_time)
+    return sorted(sets, key=by_time, reverse=order_desc)
+
+
 def get_all_daily() -> List[Dict[str, Any]]:
-    data = _load_data()
+    data = _load_data_cached(data_version())
     return data.get("daily", [])
 
 
@@ -137,11 +304,11 @@ def delete_set_by_id(user_id: str, set_id: str) -> bool:
     Delete a single set for this user matching the exact set_id.
     Returns True if a set was removed, False otherwise.
     """
-    data = _load_data()
-    before = len(data.get("sets", []))
+    data = _load_data_for_write()
+    before = len(data["sets"])
     data["sets"] = [
         s
-        for s in data.get("sets", [])
+        for s in data["sets"]
         if not (s.get("user_id") == user_id and s.get("id") == set_id)
     ]
     after = len(data["sets"])